@@ -1,9 +1,10 @@
 import os.path
-from typing import List
+from typing import List, Optional
 import click
 import tabulate
 import textwrap
 from .tester import Tester, Log
+from .telemetry import Telemetry
 
 def to_small_caps(text):
     small_caps_map = str.maketrans(
@@ -75,20 +76,44 @@ class CustomLogger:
             return self.green_red("✔", status)
         return self.green_red("✗", status)
 
+def _check_stats_file(ctx, param, value):
+    if value is not None and not os.path.isdir(os.path.dirname(os.path.abspath(value))):
+        raise click.BadParameter(f"Directory of '{value}' does not exist.")
+    return value
+
 @click.command
 @click.argument("files", nargs=-1, type=click.Path(file_okay=True, dir_okay=False, exists=True))
 @click.option("-m", "--include-metadata-report", is_flag=True, default=False)
 @click.option("-v", "--verbosity", default="minimal", type=click.Choice(["minimal", "details", "verbose"]))
 @click.option("--catalog/--no-catalog", default=True, is_flag=True,
               help="Use --no-catalog when you only one to test single files")
-def cli(files, include_metadata_report: bool, verbosity: str, catalog: bool):
-    tester = Tester()
+@click.option("--progress/--no-progress", default=None,
+              help="Show progress bars (files/s, MB/s, ETA). Defaults to showing them only in a terminal")
+@click.option("--stats-file", default=None, type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              callback=_check_stats_file,
+              help="JSON lines file where per-stage counters are appended periodically, between two files")
+@click.option("--stats-interval", default=5.0, type=click.FloatRange(min=0, min_open=True), show_default=True,
+              help="Number of seconds between two lines of --stats-file")
+@click.option("-j", "--workers", default=None, type=click.IntRange(min=1),
+              help="Number of threads used for the preflight checks (encoding, well-formedness, citeStructure)")
+def cli(files, include_metadata_report: bool, verbosity: str, catalog: bool,
+        progress: Optional[bool], stats_file: Optional[str], stats_interval: float, workers: Optional[int]):
+    telemetry = Telemetry(
+        stats_file=stats_file,
+        interval=stats_interval,
+        disable=None if progress is None else not progress
+    )
+    tester = Tester(telemetry=telemetry, workers=workers)
     printer = CustomLogger(verbosity)
-    if catalog:
-        count_collections, count_resources = tester.ingest(files)
-    else:
-        count_resources = tester.ingest_tei_only(files)
-        count_collections = 0
+    with telemetry:
+        if catalog:
+            count_collections, count_resources = tester.ingest(files)
+        else:
+            count_resources = tester.ingest_tei_only(files)
+            count_collections = 0
+        # Results of catalog files, before TEI files are added by tester.tests()
+        catalog_results = dict(tester.results)
+        tests = tester.tests()
 
     if catalog:
         printer.info(f"Found {count_collections} collection(s)")
@@ -100,7 +125,7 @@ def cli(files, include_metadata_report: bool, verbosity: str, catalog: bool):
     if catalog:
         printer.header("Report: Catalog files")
         table = [["File", "Status", "Tests"]]
-        for file, result in tester.results.items():
+        for file, result in catalog_results.items():
             printer.filter_append(
                 haystack=table,
                 hay=[
@@ -133,7 +158,7 @@ def cli(files, include_metadata_report: bool, verbosity: str, catalog: bool):
     #
     printer.header("Report: TEI files")
     table = [["File", "Status", "Tests"]]
-    for test in tester.tests():
+    for test in tests:
         result = tester.results[test]
         printer.filter_append(
             haystack=table,
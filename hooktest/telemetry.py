@@ -0,0 +1,161 @@
+import datetime
+import json
+import logging
+import os.path
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+from tqdm import tqdm
+
+T = TypeVar("T")
+# tqdm refreshes bars from a monitor thread by default, see Telemetry
+tqdm.monitor_interval = 0
+
+
+def _filesize(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class StageCounter:
+    """ Counters for a single stage of a run (eg. ingest, tests)
+    """
+    def __init__(self, name: str, total: int):
+        self.name = name
+        self.total = total
+        self.done = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self.ended: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.ended or time.monotonic()) - self.started
+
+    @property
+    def pending(self) -> int:
+        return self.total - self.done
+
+    @property
+    def files_per_s(self) -> float:
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / 1024 / 1024 / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        files_per_s = self.files_per_s
+        if not files_per_s:
+            return None
+        return self.pending / files_per_s
+
+    def to_dict(self) -> Dict:
+        eta = self.eta
+        return {
+            "done": self.done,
+            "total": self.total,
+            "pending": self.pending,
+            "bytes": self.bytes,
+            "elapsed": round(self.elapsed, 3),
+            "files_per_s": round(self.files_per_s, 3),
+            "mb_per_s": round(self.mb_per_s, 3),
+            "eta": round(eta, 3) if eta is not None else None,
+            "finished": self.ended is not None
+        }
+
+
+class Telemetry:
+    """ Progress bars and periodic JSON lines metrics for long runs
+
+    Snapshots are written from the calling thread, between two files, and never from a background thread: Saxon
+    objects freed by a garbage collection running in another thread make the process exit (code 99). For the same
+    reason, the monitor thread of tqdm is disabled.
+
+    Failing to write the stats file never stops a run: the error is logged and no further snapshot is written.
+
+    :param stats_file: Path of a JSON lines file where a snapshot of every stage is appended every `interval` seconds
+    :param interval: Minimum number of seconds between two snapshots, must be strictly positive
+    :param disable: Disable progress bars. None disables them when the output is not a TTY (see tqdm)
+    """
+    def __init__(self, stats_file: Optional[str] = None, interval: float = 5.0, disable: Optional[bool] = None):
+        if interval <= 0:
+            raise ValueError(f"Telemetry interval must be strictly positive, got {interval}")
+        self.stats_file = stats_file
+        self.interval = interval
+        self.disable = disable
+        self.stages: Dict[str, StageCounter] = {}
+        self.current: Optional[str] = None
+        self._started = time.monotonic()
+        self._last_emit = self._started
+
+    def __enter__(self) -> "Telemetry":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """ Start counting time before the first periodic snapshot """
+        self._last_emit = time.monotonic()
+
+    def stop(self):
+        """ Write a last snapshot """
+        self.emit()
+
+    def snapshot(self) -> Dict:
+        return {
+            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "elapsed": round(time.monotonic() - self._started, 3),
+            "stage": self.current,
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()}
+        }
+
+    def emit(self):
+        """ Append a snapshot to the stats file """
+        if not self.stats_file:
+            return
+        self._last_emit = time.monotonic()
+        try:
+            with open(self.stats_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.snapshot()) + "\n")
+        except OSError as E:
+            logging.error(f"Unable to write stats file `{self.stats_file}`, stats are disabled: {E}")
+            self.stats_file = None
+
+    def tick(self):
+        """ Append a snapshot to the stats file if `interval` seconds went by since the last one """
+        if time.monotonic() - self._last_emit >= self.interval:
+            self.emit()
+
+    def stage(
+            self,
+            name: str,
+            items: Iterable[T],
+            path: Callable[[T], str] = str,
+            total: Optional[int] = None
+    ) -> Iterator[T]:
+        """ Iterate over items while tracking progress for the stage `name`
+
+        :param name: Name of the stage
+        :param items: Items to iterate over
+        :param path: Function retrieving the filepath of an item, used to count bytes
+        :param total: Number of items, required to consume `items` lazily (eg. results of a pool)
+        """
+        if total is None:
+            items: List[T] = list(items)
+            total = len(items)
+        counter = self.stages[name] = StageCounter(name, total)
+        self.current = name
+        with tqdm(total=total, desc=name, unit="file", disable=self.disable, leave=False) as bar:
+            for item in items:
+                yield item
+                counter.done += 1
+                counter.bytes += _filesize(path(item))
+                bar.set_postfix_str(f"{counter.mb_per_s:.2f}MB/s", refresh=False)
+                bar.update(1)
+                self.tick()
+        counter.ended = time.monotonic()
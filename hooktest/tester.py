@@ -1,7 +1,11 @@
+import codecs
+import contextlib
 import dataclasses
+import gc
 import os.path
 import re
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Tuple, Union
 from dapytains.processor import get_xpath_proc
 from dapytains.metadata.classes import Collection
@@ -9,6 +13,7 @@ from dapytains.tei.citeStructure import CitableUnit, CitableStructure, CiteStruc
 from dapytains.tei.document import Document, xpath_eval
 from dapytains.metadata.xml_parser import parse, Catalog
 from lxml import etree as ET
+from .telemetry import Telemetry
 
 
 # Monkey patch for test
@@ -148,12 +153,159 @@ def _check_dbl_refs(
     return returns
 
 
+TEI_NS = {"tei": "http://www.tei-c.org/ns/1.0"}
+_XML_DECL_ENCODING = re.compile(rb"""^<\?xml[^>]*encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+_DECODE_CHUNK_SIZE = 64 * 1024
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# Autodetection of encodings without BOM from the first four bytes, see XML 1.0 Appendix F.1
+_XML_START = (
+    (b"\x00\x00\x00<", "utf-32-be"),
+    (b"<\x00\x00\x00", "utf-32-le"),
+    (b"\x00<\x00?", "utf-16-be"),
+    (b"<\x00?\x00", "utf-16-le"),
+)
+
+
+def _detect_encoding(data: bytes) -> str:
+    """ Detect the encoding of an XML file using its BOM, its first four bytes, then its XML declaration
+    (defaults to UTF-8)
+
+    >>> _detect_encoding(b'<?xml version="1.0" encoding="ISO-8859-1"?><TEI/>')
+    'ISO-8859-1'
+    >>> _detect_encoding(codecs.BOM_UTF8 + b'<TEI/>')
+    'utf-8-sig'
+    >>> _detect_encoding('<?xml version="1.0" encoding="UTF-16"?><TEI/>'.encode("utf-16-le"))
+    'utf-16-le'
+    >>> _detect_encoding(b'<?xml version = "1.0" encoding = "ISO-8859-1" ?><TEI/>')
+    'ISO-8859-1'
+    >>> _detect_encoding(b'<TEI/>')
+    'utf-8'
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding
+    for start, encoding in _XML_START:
+        if data.startswith(start):
+            return encoding
+    match = _XML_DECL_ENCODING.match(data)
+    if match:
+        return match.group(1).decode("ascii")
+    return "utf-8"
+
+
+def _find_decoding_error(
+        data: bytes,
+        encoding: str,
+        chunk_size: int = _DECODE_CHUNK_SIZE
+) -> Optional[Tuple[int, str]]:
+    """ Decode data chunk by chunk, without keeping the decoded text
+
+    :param data: Content of the file
+    :param encoding: Encoding to check
+    :param chunk_size: Number of bytes decoded at once
+    :returns: Byte offset and reason of the first decoding error, if any
+    :raises LookupError: When the encoding is unknown
+
+    >>> _find_decoding_error(b"abc\\xe9def", "utf-8", chunk_size=2)
+    (3, 'invalid continuation byte')
+    >>> _find_decoding_error(b"abc\\xc3", "utf-8", chunk_size=2)
+    (3, 'unexpected end of data')
+    >>> _find_decoding_error("ééé".encode("utf-8"), "utf-8", chunk_size=1) is None
+    True
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    view = memoryview(data)
+    for start in range(0, len(data), chunk_size):
+        pending = len(decoder.getstate()[0])
+        try:
+            decoder.decode(view[start:start + chunk_size])
+        except UnicodeDecodeError as E:
+            return start - pending + E.start, E.reason
+    pending = len(decoder.getstate()[0])
+    try:
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError as E:
+        return len(data) - pending + E.start, E.reason
+    return None
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """ Collect garbage, then pause the collector while worker threads run
+
+    Saxon objects must be freed by the thread that created them: a collection triggered in a worker thread makes
+    the process exit (code 99).
+    """
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def preflight(filepath: str) -> List[Log]:
+    """ Cheap checks run before building a Document: encoding, well-formedness and presence of a citeStructure
+
+    Checks stop at the first failure, as the following ones depend on it.
+
+    :param filepath: Path to the TEI file
+    :returns: Logs of the checks that were run
+    """
+    try:
+        with open(filepath, "rb") as f:
+            data = f.read()
+    except OSError as E:
+        return [Log("preflight(read)", False, details=f"Unable to read file: {E}")]
+
+    encoding = _detect_encoding(data)
+    try:
+        error = _find_decoding_error(data, encoding)
+    except LookupError:
+        return [Log("preflight(encoding)", False, details=f"Unknown encoding `{encoding}`")]
+    if error:
+        return [Log(
+            "preflight(encoding)", False,
+            details=f"Unable to decode file as `{encoding}` at byte {error[0]}: {error[1]}"
+        )]
+    logs = [Log("preflight(encoding)", True, details=encoding)]
+
+    try:
+        root = ET.fromstring(data, parser=ET.XMLParser(huge_tree=True, resolve_entities=False, no_network=True))
+    except ET.XMLSyntaxError as E:
+        logs.append(Log(
+            "preflight(well-formed)", False,
+            details=f"Line {E.lineno}, column {E.position[1]}: {E.msg}"
+        ))
+        return logs
+    logs.append(Log("preflight(well-formed)", True))
+
+    # Same path as the one read by dapytains.tei.document.Document
+    refs_decl = root.xpath("/tei:TEI/tei:teiHeader/tei:encodingDesc/tei:refsDecl[tei:citeStructure]", namespaces=TEI_NS)
+    logs.append(Log(
+        "preflight(citeStructure)", len(refs_decl) > 0,
+        details=f"refsDecl(s) with citeStructure: {len(refs_decl)}" if refs_decl
+        else "No /TEI/teiHeader/encodingDesc/refsDecl containing a citeStructure was found"
+    ))
+    return logs
+
+
 class Tester:
     """ Tester class, allows for retrieving results outside of the CLI
     """
-    def __init__(self):
+    def __init__(self, telemetry: Optional[Telemetry] = None, workers: Optional[int] = None):
         self.catalog = Catalog()
         self.results: Dict[str, Result] = {}
+        self.telemetry = telemetry or Telemetry(disable=True)
+        self.workers = workers
 
         # Load the Relax NG schema
         self.catalog_schema = ET.RelaxNG(
@@ -194,7 +346,7 @@ class Tester:
         :returns: Number of collections found, number of resources found
         """
 
-        for file in files:
+        for file in self.telemetry.stage("ingest", files):
             file = os.path.relpath(file)
             try:
                 before = len(self.catalog.relationships)
@@ -230,21 +382,49 @@ class Tester:
                 )
         return len(self.catalog.objects), len([o for o in self.catalog.objects.values() if o.resource])
 
+    def run_preflight(self, filepaths: List[str]) -> Dict[str, List[Log]]:
+        """ Run the preflight checks over files in parallel
+
+        :param filepaths: TEI files to check
+        :returns: Logs of the preflight checks, per filepath
+        """
+        logs: Dict[str, List[Log]] = {}
+        with _gc_paused(), ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(preflight, filepath): filepath for filepath in filepaths}
+            for future in self.telemetry.stage(
+                "preflight", as_completed(futures), path=lambda future: futures[future], total=len(futures)
+            ):
+                try:
+                    logs[futures[future]] = future.result()
+                except Exception as E:
+                    logs[futures[future]] = [
+                        Log("preflight", False, details=f"Exception at preflight time: {E}")
+                    ]
+        return logs
+
     def tests(self):
         resources = [o for o in self.catalog.objects.values() if o.resource]
+        preflights = self.run_preflight([r.filepath for r in resources])
+        viable = []
         for r in resources:
+            if Result(r.filepath, preflights[r.filepath]).status:
+                viable.append(r)
+            else:
+                self.results[r.filepath] = Result(r.filepath, preflights[r.filepath])
+
+        for r in self.telemetry.stage("tests", viable, path=lambda r: r.filepath):
             try:
                 doc = Document(r.filepath)
             except Exception as E:
                 self.results[r.filepath] = Result(
                     r.filepath,
-                    [Log("parse", False, details=f"Exception at parsing time: {E}")]
+                    preflights[r.filepath] + [Log("parse", False, details=f"Exception at parsing time: {E}")]
                 )
                 continue
 
             self.results[r.filepath] = Result(
                 r.filepath,
-                [
+                preflights[r.filepath] + [
                     Log("parse", True),
                     Log("parse(refsDecl/@n)", True, details=f"Tree(s) found: {len(doc.citeStructure)}")
                 ]
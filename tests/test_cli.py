@@ -1,8 +1,11 @@
+import gc
+import json
 import os.path
 
 import pytest
 from click.testing import CliRunner
 from hooktest.cli import cli
+from hooktest import tester as tester_module
 from hooktest.tester import Result
 
 
@@ -57,3 +60,114 @@ def test_forbidden_ref(runner):
     assert '✗' in result.output, "File has a failing test"
     assert 'forbiddenRefs[Tree=default]' in result.output, "Tree Default has forbidden references"
     assert count_failing(result.return_value.results[get_path("forbid.xml")]) == 1, "Only one failing test"
+
+
+def test_stats_file(runner, tmp_path):
+    """Test that the stats file records per-stage counters"""
+    stats = tmp_path / "stats.jsonl"
+    result = runner.invoke(
+        cli,
+        ['--no-catalog', '--stats-file', str(stats), get_path("correct_simple.xml"), get_path("forbid.xml")],
+        standalone_mode=False
+    )
+    assert result.exception is None, "Run should not fail"
+    lines = [json.loads(line) for line in stats.read_text().splitlines()]
+    assert lines, "At least the final snapshot is written"
+    assert lines[-1]["stages"]["tests"]["done"] == 2, "Both files were tested"
+    assert lines[-1]["stages"]["tests"]["pending"] == 0, "Nothing is left in the queue"
+    assert lines[-1]["stages"]["tests"]["bytes"] > 0, "Bytes are counted"
+    assert lines[-1]["stage"] == "tests", "Last stage is reported"
+    assert lines[-1]["stages"]["tests"]["finished"], "Stage is finished"
+    assert lines[-1]["stages"]["tests"]["eta"] in (0, None), "Nothing is left to wait for"
+
+
+def test_preflight_malformed(runner):
+    """Test that a malformed file is reported by the preflight checks"""
+    result = runner.invoke(cli, ['--no-catalog', get_path("malformed.xml")], standalone_mode=False)
+    assert '✗' in result.output, "File has a failing test"
+    assert 'preflight(well-formed)' in result.output, "Well-formedness is reported"
+    assert "Line 13" in result.output, "Position of the error is given"
+    statuses = result.return_value.results[get_path("malformed.xml")].statuses
+    assert "parse" not in [s.name for s in statuses], "Document is never built"
+
+
+def test_preflight_no_citestructure(runner):
+    """Test that a file without citeStructure is reported by the preflight checks"""
+    result = runner.invoke(cli, ['--no-catalog', get_path("no_citestructure.xml")], standalone_mode=False)
+    assert '✗' in result.output, "File has a failing test"
+    assert 'preflight(citeStructure)' in result.output, "Missing citeStructure is reported"
+    assert count_failing(result.return_value.results[get_path("no_citestructure.xml")]) == 1, "Only one failing test"
+
+
+def test_preflight_invalid_byte(runner):
+    """Test that an undecodable byte is reported with its offset"""
+    result = runner.invoke(cli, ['--no-catalog', get_path("invalid_byte.xml")], standalone_mode=False)
+    statuses = result.return_value.results[get_path("invalid_byte.xml")].statuses
+    assert [(s.name, s.status) for s in statuses] == [("preflight(encoding)", False)], "Only encoding is checked"
+    assert statuses[0].details.startswith("Unable to decode file as `UTF-8` at byte 178"), "Offset is reported"
+
+
+def test_preflight_unknown_encoding(runner):
+    """Test that an unknown declared encoding is reported"""
+    result = runner.invoke(cli, ['--no-catalog', get_path("unknown_encoding.xml")], standalone_mode=False)
+    statuses = result.return_value.results[get_path("unknown_encoding.xml")].statuses
+    assert [(s.name, s.status) for s in statuses] == [("preflight(encoding)", False)], "Only encoding is checked"
+    assert statuses[0].details == "Unknown encoding `X-UNKNOWN-42`", "Declared encoding is reported"
+
+
+def test_preflight_utf16_without_bom(runner):
+    """Test that UTF-16 files without BOM are detected from their first bytes"""
+    result = runner.invoke(cli, ['--no-catalog', '-v', 'verbose', get_path("utf16_no_bom.xml")], standalone_mode=False)
+    assert "preflight(encoding): utf-16-le" in result.output, "Encoding is detected"
+    assert count_failing(result.return_value.results[get_path("utf16_no_bom.xml")]) == 0, "Zero failing test"
+
+
+def test_preflight_misplaced_refsdecl(runner):
+    """Test that a refsDecl outside of teiHeader/encodingDesc is not accepted"""
+    result = runner.invoke(cli, ['--no-catalog', get_path("misplaced_refsdecl.xml")], standalone_mode=False)
+    assert 'preflight(citeStructure)' in result.output, "Misplaced refsDecl is reported"
+    assert count_failing(result.return_value.results[get_path("misplaced_refsdecl.xml")]) == 1, "Only one failing test"
+
+
+def test_preflight_workers(runner):
+    """Test that the preflight pool size can be set and every file is still reported"""
+    files = ["correct_simple.xml", "malformed.xml", "no_citestructure.xml", "invalid_byte.xml"]
+    result = runner.invoke(cli, ['--no-catalog', '-j', '2'] + [get_path(f) for f in files], standalone_mode=False)
+    assert result.exception is None, "Run should not fail"
+    assert result.return_value.workers == 2, "Pool size is passed to the tester"
+    assert gc.isenabled(), "Garbage collector is enabled again after the preflight pool"
+    assert [f for f in files if result.return_value.results[get_path(f)].status] == ["correct_simple.xml"], \
+        "Only the correct file passes"
+
+
+def test_preflight_exception(monkeypatch):
+    """Test that an unexpected exception in preflight is turned into a Log"""
+    def broken(filepath):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(tester_module, "preflight", broken)
+    logs = tester_module.Tester().run_preflight([get_path("correct_simple.xml")])
+    assert [(s.name, s.status) for s in logs[get_path("correct_simple.xml")]] == [("preflight", False)]
+    assert "boom" in logs[get_path("correct_simple.xml")][0].details
+
+
+def test_stats_file_missing_directory(runner, tmp_path):
+    """Test that a stats file in a missing directory is refused before running"""
+    stats = tmp_path / "missing" / "stats.jsonl"
+    result = runner.invoke(cli, ['--no-catalog', '--stats-file', str(stats), get_path("correct_simple.xml")])
+    assert result.exit_code == 2, "Usage error"
+    assert "--stats-file" in result.output, "Option is named in the error"
+    assert "Report: TEI files" not in result.output, "Nothing was tested"
+
+
+def test_preflight_declaration_with_spaces(runner):
+    """Test that spaces around `=` in the XML declaration are accepted"""
+    result = runner.invoke(cli, ['--no-catalog', '-v', 'verbose', get_path("latin1_spaces.xml")], standalone_mode=False)
+    assert "preflight(encoding): ISO-8859-1" in result.output, "Declared encoding is detected"
+    assert count_failing(result.return_value.results[get_path("latin1_spaces.xml")]) == 0, "Zero failing test"
+
+
+def test_workers_must_be_positive(runner):
+    """Test that a pool without workers is refused before running"""
+    result = runner.invoke(cli, ['--no-catalog', '-j', '0', get_path("correct_simple.xml")])
+    assert result.exit_code == 2, "Usage error"
+    assert "--workers" in result.output, "Option is named in the error"
@@ -0,0 +1,59 @@
+import json
+import threading
+import time
+
+import pytest
+from hooktest.telemetry import StageCounter, Telemetry
+
+
+def test_eta_without_elapsed_time():
+    """Test that a stage finished within the clock resolution does not divide by zero"""
+    counter = StageCounter("tests", 2)
+    counter.done = 1
+    counter.ended = counter.started
+    assert counter.eta is None, "No ETA without a measurable speed"
+    assert counter.to_dict()["eta"] is None, "Snapshot is still produced"
+
+
+def test_invalid_interval():
+    """Test that a non-positive interval is refused"""
+    with pytest.raises(ValueError):
+        Telemetry(interval=0)
+
+
+def test_periodic_emitter(tmp_path):
+    """Test that snapshots are written periodically while a stage runs"""
+    stats = tmp_path / "stats.jsonl"
+    threads = threading.active_count()
+    with Telemetry(stats_file=str(stats), interval=0.05, disable=True) as telemetry:
+        for _ in telemetry.stage("tests", ["a.xml", "b.xml", "c.xml"]):
+            assert threading.active_count() == threads, "Snapshots are not written from another thread"
+            time.sleep(0.2)
+    lines = [json.loads(line) for line in stats.read_text().splitlines()]
+    assert len(lines) > 3, "Several snapshots are written during the run"
+    pending = [line["stages"]["tests"]["pending"] for line in lines if "tests" in line["stages"]]
+    assert pending == sorted(pending, reverse=True), "Pending files never go up"
+    assert pending[0] > pending[-1] == 0, "Pending files go down to zero"
+    assert all(line["stage"] == "tests" for line in lines if line["stages"]), "Current stage is reported"
+    assert lines[-1]["stages"]["tests"]["finished"], "Last snapshot marks the stage as finished"
+    assert not lines[0]["stages"].get("tests", {}).get("finished"), "Stage is not finished at the start"
+
+
+def test_unwritable_stats_file(tmp_path):
+    """Test that failing to write the stats file does not stop the run"""
+    done = []
+    # Appending to a directory raises an OSError
+    with Telemetry(stats_file=str(tmp_path), interval=0.01, disable=True) as telemetry:
+        for item in telemetry.stage("tests", ["a.xml", "b.xml"]):
+            time.sleep(0.02)
+            done.append(item)
+    assert done == ["a.xml", "b.xml"], "Every item was processed"
+    assert telemetry.stats_file is None, "Stats are disabled after the first error"
+
+
+def test_no_tqdm_monitor_thread():
+    """Test that progress bars do not start tqdm monitor thread"""
+    threads = threading.active_count()
+    telemetry = Telemetry(disable=False)
+    for _ in telemetry.stage("tests", ["a.xml", "b.xml"]):
+        assert threading.active_count() == threads, "No thread is started by progress bars"